@@ -1,6 +1,8 @@
 import pandas as pd
 import logging
-from parse_nessus import parse_nessus_file
+from parse_nessus import parse_nessus_file, COMPLIANCE_FAMILY
+from blob_store import BLOB_STORE_PATH, BlobStore
+from scan_sketches import build_scan_sketch, merge_scan_sketches, sketch_metrics, save_sketch
 from datetime import datetime
 import os
 import json
@@ -8,15 +10,30 @@ import json
 # Setup logging
 logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
 
-def analyze_data(metadata_df, assets_df, vulnerabilities_df):
+def analyze_data(metadata_df, assets_df, vulnerabilities_df, mode='exact', compliance_df=None, sketch=None):
     """
     Analyze the parsed Nessus data to extract key metrics for reporting.
     
     :param metadata_df: DataFrame containing metadata information
     :param assets_df: DataFrame containing asset information
     :param vulnerabilities_df: DataFrame containing vulnerability information
+    :param mode: 'exact' for exact metrics, 'approximate' for sketch-based metrics
+    :param compliance_df: Optional DataFrame containing compliance results; when non-empty,
+        compliance items are reported under "compliance" and left out of the vulnerability KPIs
+    :param sketch: Optional prebuilt ScanSketch of this scan, used in approximate mode
     :return: Dictionary containing the calculated metrics
     """
+    if compliance_df is not None and not compliance_df.empty:
+        vulnerabilities_df = exclude_compliance_items(vulnerabilities_df)
+
+    if mode == 'approximate':
+        metrics = sketch_metrics(sketch if sketch is not None else build_scan_sketch(vulnerabilities_df))
+        if compliance_df is not None and not compliance_df.empty:
+            metrics["compliance"] = analyze_compliance(compliance_df)
+        return metrics
+    if mode != 'exact':
+        raise ValueError(f"Unknown analysis mode: {mode}")
+
     logging.info("Starting analysis of Nessus data")
 
     # Exclude informational severity ratings (assuming severity 0 is informational)
@@ -74,10 +91,74 @@ def analyze_data(metadata_df, assets_df, vulnerabilities_df):
         "top_affected_assets": top_affected_assets.to_dict(orient='records'),  # Table
         "common_vulnerabilities": common_vulnerabilities.to_dict(orient='records')  # Table
     }
+    if compliance_df is not None and not compliance_df.empty:
+        metrics["compliance"] = analyze_compliance(compliance_df)
 
     logging.info("Finished analysis of Nessus data")
     return metrics
 
+def exclude_compliance_items(vulnerabilities_df):
+    """
+    Remove compliance check results so they are not counted as vulnerabilities.
+    
+    :param vulnerabilities_df: DataFrame containing vulnerability information
+    :return: DataFrame without rows from the compliance plugin family
+    """
+    return vulnerabilities_df[vulnerabilities_df['pluginFamily'] != COMPLIANCE_FAMILY]
+
+def analyze_compliance(compliance_df):
+    """
+    Analyze compliance check results to extract pass/fail metrics.
+    
+    :param compliance_df: DataFrame containing compliance results
+    :return: Dictionary containing the compliance metrics
+    """
+    logging.info("Starting analysis of compliance results")
+
+    # KPI 1: Results by outcome (PASSED, FAILED, WARNING, ERROR)
+    result_counts = compliance_df['result'].value_counts()
+    total_checks = len(compliance_df)
+    passed_checks = int(result_counts.get('PASSED', 0))
+    failed_checks = int(result_counts.get('FAILED', 0))
+
+    # KPI 2: Pass Rate
+    pass_rate = (passed_checks / total_checks) * 100 if total_checks > 0 else 0
+    logging.debug(f"Compliance pass rate: {pass_rate:.2f}%")
+
+    # Table 1: Top 5 Assets by Failed Checks
+    failed_df = compliance_df[compliance_df['result'] == 'FAILED']
+    failed_by_asset = failed_df.groupby('asset_ip').size().reset_index(name='failed_count').nlargest(5, 'failed_count')
+
+    # Table 2: Top 5 Most Failed Checks
+    failed_by_check = failed_df.groupby(['check_id', 'check_name']).size().reset_index(name='count').nlargest(5, 'count')
+
+    compliance_metrics = {
+        "total_checks": total_checks,
+        "passed_checks": passed_checks,
+        "failed_checks": failed_checks,
+        "pass_rate": pass_rate,
+        "result_counts": {k: int(v) for k, v in result_counts.items()},
+        "assets_with_failures": int(failed_df['asset_ip'].nunique()),
+        "top_failed_assets": failed_by_asset.to_dict(orient='records'),
+        "top_failed_checks": failed_by_check.to_dict(orient='records')
+    }
+
+    logging.info("Finished analysis of compliance results")
+    return compliance_metrics
+
+def analyze_fleet(sketches, top_n=5):
+    """
+    Roll up per-scan sketches into approximate fleet-wide metrics.
+    
+    :param sketches: Iterable of ScanSketch objects, e.g. from load_sketches
+    :param top_n: Number of rows in the top-N tables
+    :return: Dictionary containing the approximate metrics and their error bounds
+    """
+    logging.info("Starting fleet rollup of scan sketches")
+    metrics = sketch_metrics(merge_scan_sketches(sketches), top_n=top_n)
+    logging.info(f"Finished fleet rollup over {metrics['scans']} scans")
+    return metrics
+
 def save_metrics(metrics, directory='../metrics'):
     """
     Save the metrics to a JSON file with a timestamp, ensuring old files are deleted.
@@ -112,8 +193,9 @@ if __name__ == "__main__":
         # Path to the Nessus file
         nessus_file_path = '../exports/nessus_medium.nessus'
 
-        # Parse the Nessus file
-        metadata_df, assets_df, vulnerabilities_df, policy = parse_nessus_file(nessus_file_path)
+        # Parse the Nessus file, keeping the large text fields out of the analysis working set
+        with BlobStore(BLOB_STORE_PATH) as blob_store:
+            metadata_df, assets_df, vulnerabilities_df, policy, compliance_df = parse_nessus_file(nessus_file_path, blob_store)
 
         # Validate parsed DataFrames
         if metadata_df.empty or assets_df.empty or vulnerabilities_df.empty:
@@ -121,10 +203,13 @@ if __name__ == "__main__":
             exit(1)
         
         # Analyze the parsed data
-        metrics = analyze_data(metadata_df, assets_df, vulnerabilities_df)
+        metrics = analyze_data(metadata_df, assets_df, vulnerabilities_df, compliance_df=compliance_df)
 
         # Save metrics to a JSON file
         save_metrics(metrics)
 
+        # Save the scan sketch for fleet rollups with analyze_fleet
+        save_sketch(build_scan_sketch(exclude_compliance_items(vulnerabilities_df)), metadata_df['scan_name'].iloc[0])
+
     except Exception as e:
         logging.error(f"Script execution failed: {e}")
@@ -0,0 +1,133 @@
+import hashlib
+import logging
+import mmap
+import os
+import struct
+import zlib
+
+# Setup logging
+logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Large text fields moved out of the vulnerabilities DataFrame
+BLOB_COLUMNS = ('description', 'plugin_output')
+
+# Default side file, next to the parsed CSV exports
+BLOB_STORE_PATH = '../parsed/text_blobs.bin'
+
+# Each blob is stored as: 16-byte digest of the text, 4-byte compressed length, zlib data
+_HEADER = struct.Struct('<16sI')
+
+
+class BlobStore:
+    """
+    Append-only side file of compressed, deduplicated text blobs.
+
+    Rows reference text by byte offset; reads go through a memory map so text
+    is only decompressed when a finding is displayed or exported.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        self._file = open(path, 'a+b')
+        self._mmap = None
+        self._offsets = self._index()
+
+    def _index(self):
+        """
+        Rebuilds the digest -> offset index by walking the blob headers.
+
+        A trailing record cut short by a crash is truncated away.
+        """
+        offsets = {}
+        self._file.seek(0, os.SEEK_END)
+        size = self._file.tell()
+        offset = 0
+        while offset + _HEADER.size <= size:
+            self._file.seek(offset)
+            digest, length = _HEADER.unpack(self._file.read(_HEADER.size))
+            if offset + _HEADER.size + length > size:
+                break
+            offsets.setdefault(digest, offset)
+            offset += _HEADER.size + length
+        if offset < size:
+            logging.warning(f"Truncating incomplete blob record at offset {offset} in {self.path}")
+            self._file.truncate(offset)
+        logging.debug(f"Indexed {len(offsets)} blobs in {self.path}")
+        return offsets
+
+    def put(self, text):
+        """
+        Stores text, reusing an existing blob when identical text was stored before.
+
+        :param text: Text to store
+        :return: Byte offset of the blob
+        """
+        data = text.encode('utf-8')
+        digest = hashlib.blake2b(data, digest_size=16).digest()
+        offset = self._offsets.get(digest)
+        if offset is None:
+            compressed = zlib.compress(data)
+            self._file.seek(0, os.SEEK_END)
+            offset = self._file.tell()
+            self._file.write(_HEADER.pack(digest, len(compressed)))
+            self._file.write(compressed)
+            self._offsets[digest] = offset
+            self._close_mmap()
+        return offset
+
+    def get(self, offset):
+        """
+        Loads the text stored at an offset.
+
+        :param offset: Byte offset returned by put
+        :return: Stored text
+        """
+        if self._mmap is None:
+            self._file.flush()
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        offset = int(offset)
+        _, length = _HEADER.unpack_from(self._mmap, offset)
+        start = offset + _HEADER.size
+        return zlib.decompress(self._mmap[start:start + length]).decode('utf-8')
+
+    def _close_mmap(self):
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+    def close(self):
+        """
+        Closes the memory map and the underlying file.
+        """
+        self._close_mmap()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def load_blob_columns(vulnerabilities_df, blob_store, columns=BLOB_COLUMNS):
+    """
+    Restores externalised text columns, e.g. for display or CSV export.
+
+    Pass a filtered DataFrame to load text only for the findings being shown.
+
+    :param vulnerabilities_df: DataFrame with <column>_offset columns
+    :param blob_store: BlobStore the offsets refer to
+    :param columns: Text columns to restore
+    :return: Copy of the DataFrame with the text columns restored
+    """
+    df = vulnerabilities_df.copy()
+    for column in columns:
+        offset_column = f"{column}_offset"
+        if offset_column in df.columns:
+            position = df.columns.get_loc(offset_column)
+            text = df.pop(offset_column).map(blob_store.get)
+            df.insert(position, column, text)
+    return df
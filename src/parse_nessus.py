@@ -3,16 +3,22 @@ import pandas as pd
 import logging
 from datetime import datetime
 import os
+from blob_store import BLOB_COLUMNS, BLOB_STORE_PATH, BlobStore, load_blob_columns
 
 # Setup logging
 logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
 
-def parse_nessus_file(file_path):
+# Namespace of the compliance elements inside ReportItem
+NESSUS_NAMESPACES = {'cm': 'http://www.nessus.org/cm'}
+COMPLIANCE_FAMILY = 'Policy Compliance'
+
+def parse_nessus_file(file_path, blob_store=None):
     """
-    Parses the Nessus file and extracts metadata, assets, vulnerabilities, and policy data.
+    Parses the Nessus file and extracts metadata, assets, vulnerabilities, policy, and compliance data.
 
     :param file_path: Path to the Nessus file
-    :return: DataFrames containing metadata, assets, vulnerabilities, and policy data
+    :param blob_store: Optional BlobStore to hold large text fields out of line
+    :return: DataFrames containing metadata, assets, vulnerabilities, policy, and compliance data
     """
     try:
         logging.info(f"Starting to parse the Nessus file: {file_path}")
@@ -21,11 +27,12 @@ def parse_nessus_file(file_path):
 
         metadata = extract_metadata(root)
         assets = extract_assets(root)
-        vulnerabilities = extract_vulnerabilities(root)
+        vulnerabilities = extract_vulnerabilities(root, blob_store)
         policy = extract_policy(root)
+        compliance = extract_compliance(root) if has_compliance_items(root) else pd.DataFrame()
 
         logging.info("Finished parsing the Nessus file")
-        return metadata, assets, vulnerabilities, policy
+        return metadata, assets, vulnerabilities, policy, compliance
     except ET.ParseError as e:
         logging.error(f"Error parsing the Nessus file: {e}")
         raise
@@ -84,11 +91,15 @@ def extract_assets(root):
         logging.error(f"Error extracting assets: {e}")
         return pd.DataFrame()
 
-def extract_vulnerabilities(root):
+def extract_vulnerabilities(root, blob_store=None):
     """
     Extracts vulnerability information from the Nessus XML root.
 
+    When a blob store is given, the large text fields are written to it and the
+    rows hold <field>_offset columns instead (see blob_store.load_blob_columns).
+
     :param root: Root of the parsed Nessus XML
+    :param blob_store: Optional BlobStore to hold large text fields out of line
     :return: DataFrame containing vulnerability information
     """
     vulnerabilities = []
@@ -129,12 +140,13 @@ def extract_vulnerabilities(root):
                     "cvss_temporal_score": report_item.findtext('cvss_temporal_score', 'N/A'),
                     "plugin_type": report_item.findtext('plugin_type', 'N/A'),
                     "plugin_version": report_item.findtext('plugin_version', 'N/A'),
-                    "cm:complianceinfo": report_item.findtext('cm:complianceinfo', 'N/A'),
-                    "cm:complianceresult": report_item.findtext('cm:complianceresult', 'N/A'),
-                    "cm:complianceactualvalue": report_item.findtext('cm:complianceactualvalue', 'N/A'),
-                    "cm:compliancecheck-id": report_item.findtext('cm:compliancecheck-id', 'N/A'),
                     "asset_ip": asset_ip
                 }
+                if blob_store is not None:
+                    vulnerability = {
+                        (f"{key}_offset" if key in BLOB_COLUMNS else key): (blob_store.put(value) if key in BLOB_COLUMNS else value)
+                        for key, value in vulnerability.items()
+                    }
                 vulnerabilities.append(vulnerability)
         logging.debug(f"Extracted {len(vulnerabilities)} vulnerabilities")
         return pd.DataFrame(vulnerabilities)
@@ -142,6 +154,44 @@ def extract_vulnerabilities(root):
         logging.error(f"Error extracting vulnerabilities: {e}")
         return pd.DataFrame()
 
+def has_compliance_items(root):
+    """
+    Checks cheaply whether the scan contains compliance results.
+
+    Looks for a ReportItem in the compliance plugin family without reading its
+    children. The policy's family selection is not used, since it only says
+    whether the family was enabled.
+
+    :param root: Root of the parsed Nessus XML
+    :return: True if compliance extraction should run
+    """
+    return root.find(f'.//ReportItem[@pluginFamily="{COMPLIANCE_FAMILY}"]') is not None
+
+def extract_compliance(root):
+    """
+    Extracts compliance check results from the Nessus XML root.
+
+    :param root: Root of the parsed Nessus XML
+    :return: DataFrame containing one compliance result per check and asset
+    """
+    results = []
+    try:
+        for report_host in root.findall('.//ReportHost'):
+            asset_ip = report_host.attrib.get('name', 'N/A')
+            for report_item in report_host.iterfind(f'.//ReportItem[@pluginFamily="{COMPLIANCE_FAMILY}"]'):
+                results.append({
+                    "asset_ip": asset_ip,
+                    "check_id": report_item.findtext('cm:compliance-check-id', 'N/A', NESSUS_NAMESPACES),
+                    "check_name": report_item.findtext('cm:compliance-check-name', 'N/A', NESSUS_NAMESPACES),
+                    "result": report_item.findtext('cm:compliance-result', 'N/A', NESSUS_NAMESPACES),
+                    "actual_value": report_item.findtext('cm:compliance-actual-value', 'N/A', NESSUS_NAMESPACES)
+                })
+        logging.debug(f"Extracted {len(results)} compliance results")
+        return pd.DataFrame(results)
+    except AttributeError as e:
+        logging.error(f"Error extracting compliance: {e}")
+        return pd.DataFrame()
+
 def extract_policy(root):
     """
     Extracts policy information from the Nessus XML root.
@@ -240,7 +290,8 @@ def validate_dataframes(metadata_df, assets_df, vulnerabilities_df, policy_df, s
         # Check vulnerabilities
         assert not vulnerabilities_df.empty, "Vulnerabilities dataframe is empty"
         assert 'pluginID' in vulnerabilities_df.columns, "pluginID not in vulnerabilities dataframe"
-        assert 'description' in vulnerabilities_df.columns, "description not in vulnerabilities dataframe"
+        assert 'description' in vulnerabilities_df.columns or 'description_offset' in vulnerabilities_df.columns, \
+            "description not in vulnerabilities dataframe"
 
         # Check policy
         assert not policy_df.empty, "Policy dataframe is empty"
@@ -255,18 +306,21 @@ def validate_dataframes(metadata_df, assets_df, vulnerabilities_df, policy_df, s
 if __name__ == "__main__":
     try:
         nessus_file_path = '../exports/david_home.nessus'
-        metadata_df, assets_df, vulnerabilities_df, policy = parse_nessus_file(nessus_file_path)
-
-        # Unpack policy dataframes
-        policy_df, server_prefs_df, plugins_prefs_df = policy
-
-        # Save DataFrames to CSV for validation
-        save_dataframe(metadata_df, 'metadata')
-        save_dataframe(assets_df, 'assets')
-        save_dataframe(vulnerabilities_df, 'vulnerabilities')
-        save_dataframe(policy_df, 'policy')
-        save_dataframe(server_prefs_df, 'server_preferences')
-        save_dataframe(plugins_prefs_df, 'plugins_preferences')
+        with BlobStore(BLOB_STORE_PATH) as blob_store:
+            metadata_df, assets_df, vulnerabilities_df, policy, compliance_df = parse_nessus_file(nessus_file_path, blob_store)
+
+            # Unpack policy dataframes
+            policy_df, server_prefs_df, plugins_prefs_df = policy
+
+            # Save DataFrames to CSV for validation, loading the large text fields back for export
+            save_dataframe(metadata_df, 'metadata')
+            save_dataframe(assets_df, 'assets')
+            save_dataframe(load_blob_columns(vulnerabilities_df, blob_store), 'vulnerabilities')
+            save_dataframe(policy_df, 'policy')
+            save_dataframe(server_prefs_df, 'server_preferences')
+            save_dataframe(plugins_prefs_df, 'plugins_preferences')
+            if not compliance_df.empty:
+                save_dataframe(compliance_df, 'compliance')
 
         # Validate DataFrames
         validate_dataframes(metadata_df, assets_df, vulnerabilities_df, policy_df, server_prefs_df, plugins_prefs_df)
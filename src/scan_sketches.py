@@ -0,0 +1,412 @@
+import hashlib
+import base64
+import math
+import json
+import os
+import re
+import zlib
+import logging
+from array import array
+
+# Setup logging
+logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
+
+SKETCH_VERSION = 2
+
+# Critical findings an asset needs within one scan to count as high-risk
+HIGH_RISK_THRESHOLD = 3
+
+# Candidate keys kept for plugin families; above the number of Nessus families
+# so vulnerabilities_by_type can list every family like analyze_data does
+FAMILY_CAPACITY = 128
+
+
+def _hash64(value):
+    """
+    Hashes a value to a stable 64-bit integer.
+
+    :param value: Value to hash (converted to str)
+    :return: 64-bit unsigned integer
+    """
+    digest = hashlib.blake2b(str(value).encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'little')
+
+
+def _encode_array(values):
+    """
+    Encodes an array to a compressed base64 string for JSON storage.
+    """
+    return base64.b64encode(zlib.compress(values.tobytes())).decode('ascii')
+
+
+def _decode_array(typecode, data):
+    """
+    Decodes a base64 string produced by _encode_array back to an array.
+    """
+    values = array(typecode)
+    values.frombytes(zlib.decompress(base64.b64decode(data)))
+    return values
+
+
+class HyperLogLog:
+    """
+    HyperLogLog distinct counter. Mergeable by taking the register-wise maximum.
+
+    The relative standard error of the estimate is 1.04 / sqrt(2 ** precision).
+    """
+
+    def __init__(self, precision=12, registers=None):
+        self.precision = precision
+        self.m = 1 << precision
+        self.registers = registers if registers is not None else array('B', bytes(self.m))
+
+    def add(self, value):
+        """
+        Adds a value to the sketch.
+
+        :param value: Value to count
+        """
+        h = _hash64(value)
+        index = h & (self.m - 1)
+        w = h >> self.precision
+        rank = (64 - self.precision) - w.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other):
+        """
+        Merges another sketch with the same precision into this one.
+
+        :param other: HyperLogLog to merge
+        """
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge HyperLogLog sketches with different precision")
+        self.registers = array('B', map(max, self.registers, other.registers))
+
+    def count(self):
+        """
+        Estimates the number of distinct values added.
+
+        :return: Estimated distinct count
+        """
+        alpha = 0.7213 / (1 + 1.079 / self.m)
+        estimate = alpha * self.m * self.m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * self.m and zeros:
+            # Small range correction (linear counting)
+            estimate = self.m * math.log(self.m / zeros)
+        return int(round(estimate))
+
+    def relative_error(self):
+        """
+        :return: Relative standard error of count()
+        """
+        return 1.04 / math.sqrt(self.m)
+
+    def to_dict(self):
+        return {"precision": self.precision, "registers": _encode_array(self.registers)}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['precision'], _decode_array('B', data['registers']))
+
+
+class HeavyHitters:
+    """
+    Count-min sketch with a bounded set of candidate keys for top-k queries.
+
+    Estimates never undercount. With probability 1 - exp(-depth) an estimate
+    overcounts by at most (e / width) * total.
+    """
+
+    def __init__(self, width=2048, depth=4, capacity=64, table=None, candidates=None, total=0):
+        self.width = width
+        self.depth = depth
+        self.capacity = capacity
+        self.table = table if table is not None else array('I', bytes(4 * width * depth))
+        self.candidates = candidates if candidates is not None else {}
+        self.total = total
+
+    def _cells(self, key):
+        h = _hash64(key)
+        h1, h2 = h & 0xFFFFFFFF, (h >> 32) | 1
+        return [row * self.width + (h1 + row * h2) % self.width for row in range(self.depth)]
+
+    def estimate(self, key):
+        """
+        Estimates the count of a key.
+
+        :param key: Key to look up
+        :return: Estimated count (upper bound)
+        """
+        return min(self.table[cell] for cell in self._cells(key))
+
+    def add(self, key, count=1):
+        """
+        Adds occurrences of a key to the sketch.
+
+        :param key: Key to count
+        :param count: Number of occurrences
+        """
+        cells = self._cells(key)
+        for cell in cells:
+            self.table[cell] += count
+        self.total += count
+        self._offer(key, min(self.table[cell] for cell in cells))
+
+    def _offer(self, key, estimate):
+        if key in self.candidates or len(self.candidates) < self.capacity:
+            self.candidates[key] = estimate
+            return
+        smallest = min(self.candidates, key=self.candidates.get)
+        if estimate > self.candidates[smallest]:
+            del self.candidates[smallest]
+            self.candidates[key] = estimate
+
+    def merge(self, other):
+        """
+        Merges another sketch with the same dimensions into this one.
+
+        :param other: HeavyHitters to merge
+        """
+        if (other.width, other.depth) != (self.width, self.depth):
+            raise ValueError("Cannot merge count-min sketches with different dimensions")
+        self.table = array('I', map(sum, zip(self.table, other.table)))
+        self.total += other.total
+        keys = set(self.candidates) | set(other.candidates)
+        ranked = sorted(((self.estimate(k), k) for k in keys), reverse=True)[:self.capacity]
+        self.candidates = {k: est for est, k in ranked}
+
+    def top(self, n):
+        """
+        Returns the n keys with the highest estimated counts.
+
+        :param n: Number of keys to return
+        :return: List of (key, estimated count) tuples
+        """
+        return sorted(self.candidates.items(), key=lambda kv: (-kv[1], kv[0]))[:n]
+
+    def error_bound(self):
+        """
+        :return: Maximum overcount of estimate() with probability 1 - exp(-depth)
+        """
+        return int(math.ceil(math.e / self.width * self.total))
+
+    def to_dict(self):
+        return {
+            "width": self.width,
+            "depth": self.depth,
+            "capacity": self.capacity,
+            "total": self.total,
+            "table": _encode_array(self.table),
+            "candidates": self.candidates
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['width'], data['depth'], data['capacity'],
+                   _decode_array('I', data['table']), dict(data['candidates']), data['total'])
+
+
+class ScanSketch:
+    """
+    Mergeable summary of one or more scans used for approximate rollups.
+
+    Severity counts are exact; distinct counts use HyperLogLog and top-k
+    tables use count-min heavy hitters. An asset is high-risk when it has more
+    than HIGH_RISK_THRESHOLD critical findings within a single scan.
+    """
+
+    def __init__(self):
+        self.scans = 0
+        self.severity_counts = {}
+        self.assets = HyperLogLog()
+        self.plugin_asset_pairs = HyperLogLog()
+        self.critical_pairs = HyperLogLog()
+        self.high_risk_assets = HyperLogLog()
+        self.plugins = HeavyHitters()
+        self.families = HeavyHitters(capacity=FAMILY_CAPACITY)
+        self.asset_counts = HeavyHitters()
+
+    def merge(self, other):
+        """
+        Merges another ScanSketch into this one.
+
+        :param other: ScanSketch to merge
+        """
+        self.scans += other.scans
+        for key, count in other.severity_counts.items():
+            self.severity_counts[key] = self.severity_counts.get(key, 0) + count
+        self.assets.merge(other.assets)
+        self.plugin_asset_pairs.merge(other.plugin_asset_pairs)
+        self.critical_pairs.merge(other.critical_pairs)
+        self.high_risk_assets.merge(other.high_risk_assets)
+        self.plugins.merge(other.plugins)
+        self.families.merge(other.families)
+        self.asset_counts.merge(other.asset_counts)
+
+    def to_dict(self):
+        return {
+            "version": SKETCH_VERSION,
+            "scans": self.scans,
+            "severity_counts": self.severity_counts,
+            "assets": self.assets.to_dict(),
+            "plugin_asset_pairs": self.plugin_asset_pairs.to_dict(),
+            "critical_pairs": self.critical_pairs.to_dict(),
+            "high_risk_assets": self.high_risk_assets.to_dict(),
+            "plugins": self.plugins.to_dict(),
+            "families": self.families.to_dict(),
+            "asset_counts": self.asset_counts.to_dict()
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        if data.get('version') != SKETCH_VERSION:
+            raise ValueError(f"Unsupported sketch version: {data.get('version')}")
+        sketch = cls()
+        sketch.scans = data['scans']
+        sketch.severity_counts = dict(data['severity_counts'])
+        for name in ('assets', 'plugin_asset_pairs', 'critical_pairs', 'high_risk_assets'):
+            setattr(sketch, name, HyperLogLog.from_dict(data[name]))
+        for name in ('plugins', 'families', 'asset_counts'):
+            setattr(sketch, name, HeavyHitters.from_dict(data[name]))
+        return sketch
+
+
+def build_scan_sketch(vulnerabilities_df):
+    """
+    Builds a ScanSketch from the vulnerabilities of a single scan.
+
+    The scan is first reduced to exact per-key counts, so the sketches only see
+    distinct keys. Save the result with save_sketch to reuse it in rollups.
+
+    :param vulnerabilities_df: DataFrame containing vulnerability information
+    :return: ScanSketch summarising the scan
+    """
+    logging.info("Building scan sketch")
+    sketch = ScanSketch()
+    sketch.scans = 1
+
+    # Exclude informational severity ratings, as analyze_data does
+    findings = vulnerabilities_df[vulnerabilities_df['severity'] > 0]
+    critical = findings[findings['severity'] == 4]
+
+    sketch.severity_counts = {str(k): int(v) for k, v in findings['severity'].value_counts().items()}
+    for asset_ip in findings['asset_ip'].unique():
+        sketch.assets.add(asset_ip)
+    for plugin_id, asset_ip in findings[['pluginID', 'asset_ip']].drop_duplicates().itertuples(index=False):
+        sketch.plugin_asset_pairs.add(f"{plugin_id}|{asset_ip}")
+    for plugin_id, asset_ip in critical[['pluginID', 'asset_ip']].drop_duplicates().itertuples(index=False):
+        sketch.critical_pairs.add(f"{plugin_id}|{asset_ip}")
+
+    critical_by_asset = critical.groupby('asset_ip').size()
+    for asset_ip in critical_by_asset[critical_by_asset > HIGH_RISK_THRESHOLD].index:
+        sketch.high_risk_assets.add(asset_ip)
+
+    for column, heavy_hitters in (('pluginName', sketch.plugins), ('pluginFamily', sketch.families), ('asset_ip', sketch.asset_counts)):
+        for key, count in findings[column].value_counts().items():
+            heavy_hitters.add(key, int(count))
+
+    logging.debug(f"Sketched {len(findings)} findings")
+    return sketch
+
+
+def merge_scan_sketches(sketches):
+    """
+    Merges any number of scan sketches into a single rollup sketch.
+
+    :param sketches: Iterable of ScanSketch objects
+    :return: Merged ScanSketch
+    """
+    rollup = ScanSketch()
+    for sketch in sketches:
+        rollup.merge(sketch)
+    logging.debug(f"Merged sketches for {rollup.scans} scans")
+    return rollup
+
+
+def sketch_metrics(sketch, top_n=5):
+    """
+    Derives approximate metrics from a sketch, shaped like analyze_data's output.
+
+    :param sketch: ScanSketch (single scan or rollup)
+    :param top_n: Number of rows in the top-N tables (vulnerabilities_by_type lists every family)
+    :return: Dictionary containing the approximate metrics and their error bounds
+    """
+    vulnerabilities_by_type = [{"pluginFamily": k, "count": v} for k, v in sketch.families.top(sketch.families.capacity)]
+    other = sketch.families.total - sum(row['count'] for row in vulnerabilities_by_type)
+    if other > 0:
+        # Families evicted from the candidate set
+        vulnerabilities_by_type.append({"pluginFamily": "Other", "count": other})
+
+    severity_counts = {int(k): v for k, v in sorted(sketch.severity_counts.items(), key=lambda kv: int(kv[0]))}
+    total_vulnerabilities = sum(severity_counts.values())
+    critical_vulnerabilities = severity_counts.get(4, 0)
+    percentage_critical_vulnerabilities = (critical_vulnerabilities / total_vulnerabilities) * 100 if total_vulnerabilities > 0 else 0
+
+    metrics = {
+        "mode": "approximate",
+        "scans": sketch.scans,
+        "total_vulnerabilities": total_vulnerabilities,  # Exact
+        "unique_critical_vulnerabilities": min(sketch.critical_pairs.count(), critical_vulnerabilities),  # HyperLogLog
+        "percentage_critical_vulnerabilities": percentage_critical_vulnerabilities,  # Exact
+        "affected_assets": sketch.assets.count(),  # HyperLogLog
+        "unique_plugin_asset_pairs": sketch.plugin_asset_pairs.count(),  # HyperLogLog
+        "high_risk_assets_count": sketch.high_risk_assets.count(),  # HyperLogLog, threshold applied per scan
+        "severity_counts": severity_counts,  # Exact
+        "vulnerabilities_by_type": vulnerabilities_by_type,
+        "top_affected_assets": [{"asset_ip": k, "vuln_count": v} for k, v in sketch.asset_counts.top(top_n)],
+        "common_vulnerabilities": [{"pluginName": k, "count": v} for k, v in sketch.plugins.top(top_n)],
+        "error_bounds": {
+            "distinct_relative_error": sketch.assets.relative_error(),
+            "count_overestimate_max": sketch.plugins.error_bound(),
+            "count_confidence": 1 - math.exp(-sketch.plugins.depth)
+        }
+    }
+    return metrics
+
+
+def save_sketch(sketch, name, directory='../sketches'):
+    """
+    Save a scan sketch to a JSON file keyed on the scan name.
+
+    Re-analyzing a scan replaces its earlier sketch, so every file in the
+    directory is a distinct scan and load_sketches can roll up all of them.
+
+    :param sketch: ScanSketch to save
+    :param name: Scan name
+    :param directory: Directory to save the sketch JSON file
+    :return: Path of the saved file
+    """
+    if not os.path.exists(directory):
+        os.makedirs(directory)
+
+    safe_name = re.sub(r'[^\w.-]+', '_', name)
+    file_path = os.path.join(directory, f"sketch_{safe_name}.json")
+    with open(file_path, 'w') as f:
+        json.dump(sketch.to_dict(), f)
+
+    logging.info(f"Saved sketch to {file_path}")
+    return file_path
+
+
+def load_sketch(file_path):
+    """
+    Load a scan sketch from a JSON file written by save_sketch.
+
+    :param file_path: Path to the sketch JSON file
+    :return: ScanSketch
+    """
+    with open(file_path, 'r') as f:
+        return ScanSketch.from_dict(json.load(f))
+
+
+def load_sketches(directory='../sketches'):
+    """
+    Load every scan sketch saved by save_sketch in a directory.
+
+    :param directory: Directory containing the sketch JSON files
+    :return: List of ScanSketch objects, one per scan
+    """
+    return [load_sketch(os.path.join(directory, f)) for f in sorted(os.listdir(directory))
+            if f.startswith('sketch_') and f.endswith('.json')]
@@ -0,0 +1,34 @@
+import os
+import sys
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from analyze_data import analyze_data
+
+
+def test_compliance_items_are_not_counted_as_vulnerabilities():
+    vulnerabilities_df = pd.DataFrame(
+        [{"asset_ip": f"10.0.0.{i}", "pluginID": "100", "pluginName": "Medium finding",
+          "pluginFamily": "Misc.", "severity": 2} for i in range(20)]
+        + [{"asset_ip": "10.0.0.1", "pluginID": "21157", "pluginName": "Unix Compliance Checks",
+            "pluginFamily": "Policy Compliance", "severity": 3}] * 50)
+    compliance_df = pd.DataFrame([{"asset_ip": "10.0.0.1", "check_id": str(i), "check_name": f"Check {i}",
+                                   "result": "FAILED" if i % 2 else "PASSED", "actual_value": "0"} for i in range(50)])
+
+    for mode in ('exact', 'approximate'):
+        metrics = analyze_data(None, None, vulnerabilities_df, mode=mode, compliance_df=compliance_df)
+        assert metrics['total_vulnerabilities'] == 20
+        assert "Unix Compliance Checks" not in [row['pluginName'] for row in metrics['common_vulnerabilities']]
+        assert metrics['compliance']['failed_checks'] == 25
+        assert metrics['compliance']['pass_rate'] == 50
+
+
+def test_empty_compliance_table_keeps_all_vulnerabilities():
+    vulnerabilities_df = pd.DataFrame([{"asset_ip": "10.0.0.1", "pluginID": "21157", "pluginName": "Unix Compliance Checks",
+                                        "pluginFamily": "Policy Compliance", "severity": 3}])
+
+    metrics = analyze_data(None, None, vulnerabilities_df, compliance_df=pd.DataFrame())
+    assert metrics['total_vulnerabilities'] == 1
+    assert "compliance" not in metrics
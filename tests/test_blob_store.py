@@ -0,0 +1,47 @@
+import os
+import sys
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from blob_store import BlobStore, load_blob_columns
+from parse_nessus import parse_nessus_file
+
+
+def test_put_deduplicates_and_round_trips(tmp_path):
+    with BlobStore(str(tmp_path / 'text.blob')) as store:
+        first = store.put("plugin output " * 100)
+        other = store.put("N/A")
+        assert store.put("plugin output " * 100) == first
+        assert store.get(first) == "plugin output " * 100
+        assert store.get(other) == "N/A"
+
+
+def test_truncated_trailing_record_is_dropped(tmp_path):
+    path = str(tmp_path / 'text.blob')
+    with BlobStore(path) as store:
+        kept = store.put("kept")
+        lost = store.put("lost " * 50)
+    with open(path, 'r+b') as f:
+        f.truncate(os.path.getsize(path) - 3)
+
+    with BlobStore(path) as store:
+        assert os.path.getsize(path) == lost
+        assert store.get(kept) == "kept"
+        offset = store.put("lost " * 50)
+        assert store.get(offset) == "lost " * 50
+
+
+def test_parse_with_store_round_trips_text_columns(tmp_path):
+    nessus_file_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'vulnerability_scan.nessus')
+    inline_df = parse_nessus_file(nessus_file_path)[2]
+
+    with BlobStore(str(tmp_path / 'text.blob')) as store:
+        stored_df = parse_nessus_file(nessus_file_path, store)[2]
+        assert 'description_offset' in stored_df.columns and 'plugin_output_offset' in stored_df.columns
+        assert 'description' not in stored_df.columns and 'plugin_output' not in stored_df.columns
+        # Both findings share a description, stored once
+        assert stored_df['description_offset'].iloc[0] == stored_df['description_offset'].iloc[1]
+
+        pd.testing.assert_frame_equal(load_blob_columns(stored_df, store), inline_df)
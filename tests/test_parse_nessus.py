@@ -0,0 +1,35 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from analyze_data import analyze_data
+from parse_nessus import parse_nessus_file
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+
+def test_compliance_fields_resolve_cm_namespace():
+    # The fixture's policy marks the family disabled; detection must rely on the ReportItems
+    metadata_df, assets_df, vulnerabilities_df, policy, compliance_df = parse_nessus_file(
+        os.path.join(FIXTURES, 'compliance_scan.nessus'))
+
+    assert compliance_df[['asset_ip', 'check_id', 'result', 'actual_value']].to_dict(orient='records') == [
+        {"asset_ip": "10.0.0.5", "check_id": "a1b2c3", "result": "FAILED", "actual_value": "0666"},
+        {"asset_ip": "10.0.0.5", "check_id": "d4e5f6", "result": "PASSED", "actual_value": "no"}
+    ]
+    assert compliance_df['check_name'].iloc[0] == "1.1 Ensure permissions on /etc/passwd are configured"
+
+    metrics = analyze_data(metadata_df, assets_df, vulnerabilities_df, compliance_df=compliance_df)
+    assert metrics['total_vulnerabilities'] == 1
+    assert metrics['compliance']['failed_checks'] == 1
+
+
+def test_vulnerability_scan_has_empty_compliance_table():
+    # The fixture's policy marks the family enabled, but no compliance items were reported
+    metadata_df, assets_df, vulnerabilities_df, policy, compliance_df = parse_nessus_file(
+        os.path.join(FIXTURES, 'vulnerability_scan.nessus'))
+
+    assert compliance_df.empty
+    assert not [column for column in vulnerabilities_df.columns if column.startswith('cm:')]
+    assert len(vulnerabilities_df) == 3
@@ -0,0 +1,73 @@
+import os
+import sys
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from analyze_data import analyze_data, analyze_fleet
+from scan_sketches import build_scan_sketch, load_sketch, load_sketches, save_sketch
+
+
+def make_scan(asset_count, critical_per_asset, offset=0):
+    rows = []
+    for i in range(asset_count):
+        asset_ip = f"10.0.{(i + offset) // 250}.{(i + offset) % 250}"
+        for plugin_id in range(critical_per_asset):
+            rows.append({"asset_ip": asset_ip, "pluginID": str(plugin_id), "pluginName": f"Plugin {plugin_id}",
+                         "pluginFamily": "General", "severity": 4})
+        rows.append({"asset_ip": asset_ip, "pluginID": "100", "pluginName": "Medium finding",
+                     "pluginFamily": "Misc.", "severity": 2})
+    return pd.DataFrame(rows)
+
+
+def within(estimate, exact, relative_error):
+    return abs(estimate - exact) <= 3 * relative_error * exact + 1
+
+
+def test_approximate_matches_exact_beyond_heavy_hitter_capacity():
+    vulnerabilities_df = make_scan(500, 5)
+    exact = analyze_data(None, None, vulnerabilities_df)
+    approximate = analyze_data(None, None, vulnerabilities_df, mode='approximate')
+    relative_error = approximate['error_bounds']['distinct_relative_error']
+
+    assert exact['high_risk_assets_count'] == 500
+    assert within(approximate['high_risk_assets_count'], 500, relative_error)
+    assert within(approximate['affected_assets'], exact['affected_assets'], relative_error)
+    assert within(approximate['unique_critical_vulnerabilities'], exact['unique_critical_vulnerabilities'], relative_error)
+    assert approximate['total_vulnerabilities'] == exact['total_vulnerabilities']
+    assert approximate['severity_counts'] == exact['severity_counts']
+
+
+def test_fleet_rollup_from_saved_sketches(tmp_path):
+    paths = [save_sketch(build_scan_sketch(make_scan(300, 4, offset=i * 300)), f"scan {i}", str(tmp_path))
+             for i in range(3)]
+    metrics = analyze_fleet(load_sketch(path) for path in paths)
+    relative_error = metrics['error_bounds']['distinct_relative_error']
+
+    assert metrics['scans'] == 3
+    assert within(metrics['affected_assets'], 900, relative_error)
+    assert within(metrics['high_risk_assets_count'], 900, relative_error)
+    assert metrics['common_vulnerabilities'][0]['count'] >= 900
+    assert all(os.path.getsize(path) < 64 * 1024 for path in paths)
+
+
+def test_vulnerabilities_by_type_lists_every_family():
+    vulnerabilities_df = pd.DataFrame([{"asset_ip": f"10.0.0.{i}", "pluginID": str(family), "pluginName": f"Plugin {family}",
+                                        "pluginFamily": f"Family {family}", "severity": 2}
+                                       for family in range(12) for i in range(family + 1)])
+    exact = analyze_data(None, None, vulnerabilities_df)
+    approximate = analyze_data(None, None, vulnerabilities_df, mode='approximate')
+
+    assert sorted(approximate['vulnerabilities_by_type'], key=lambda row: row['pluginFamily']) == \
+        sorted(exact['vulnerabilities_by_type'], key=lambda row: row['pluginFamily'])
+
+
+def test_resaving_a_scan_replaces_its_sketch(tmp_path):
+    for _ in range(2):
+        save_sketch(build_scan_sketch(make_scan(50, 4)), "weekly scan", str(tmp_path))
+    save_sketch(build_scan_sketch(make_scan(50, 4, offset=50)), "other scan", str(tmp_path))
+
+    metrics = analyze_fleet(load_sketches(str(tmp_path)))
+    assert metrics['scans'] == 2
+    assert metrics['total_vulnerabilities'] == 500